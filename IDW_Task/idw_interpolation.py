@@ -140,6 +140,9 @@ def idw_interpolation(samples, densities, grid_x, grid_y, power=2, max_neighbors
         
         # 查询近邻点
         distances, indices = tree.query(batch_points, k=k_neighbors)
+        if k_neighbors == 1:
+            distances = distances[:, np.newaxis]
+            indices = indices[:, np.newaxis]
         
         # 计算权重
         distances = np.maximum(distances, 1e-8)  # 避免除零
@@ -155,6 +158,168 @@ def idw_interpolation(samples, densities, grid_x, grid_y, power=2, max_neighbors
     return interpolated.reshape(grid_x.shape)
 
 
+def idw_interpolation_lean(samples, densities, x_range, y_range, power=2, max_neighbors=10,
+                           batch_size=1000, report_memory=False):
+    """
+    精简版IDW插值内核（float32，复用预分配缓冲区）
+
+    与 idw_interpolation 结果一致（精度为float32），区别在于：
+    - 不生成meshgrid和完整网格坐标，每批次按需计算网格点坐标
+    - 权重和加权平均使用float32，中间结果写入预分配的缓冲区（out=）
+    - 坐标以网格左上角为原点平移后再计算，大地坐标（如UTM）也不会损失精度
+    - power=2 时使用乘法代替幂运算
+
+    注意：KDTree.query 不支持 out=，每批次仍会分配其返回的 distances/indices，
+    因此循环内的分配并未完全消除。
+
+    参数:
+    - samples: 样本点坐标 (N, 2)
+    - densities: 样本点密度值 (N,)
+    - x_range, y_range: 网格的一维坐标轴（相当于meshgrid的输入）
+    - power: 距离衰减系数 (默认2)
+    - max_neighbors: 最大近邻点数 (默认10)
+    - batch_size: 每批处理的网格点数 (默认1000)
+    - report_memory: 是否用tracemalloc统计并打印内存分配情况，仅用于诊断 (默认False)
+
+    返回:
+    - 插值结果 (len(y_range), len(x_range))，float32
+    - report_memory=True 时返回 (插值结果, 内存统计字典)
+    """
+    if not report_memory:
+        return _idw_lean_kernel(samples, densities, x_range, y_range, power,
+                                max_neighbors, batch_size, None)
+
+    import tracemalloc
+    # 调用方已开启tracemalloc时不能替其关闭
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        result, stats = _idw_lean_kernel(samples, densities, x_range, y_range, power,
+                                         max_neighbors, batch_size, tracemalloc)
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    print(f"内存统计：预分配缓冲区{stats['scratch_buffers']}个，共{stats['scratch_bytes'] / 1e6:.2f} MB")
+    print(f"循环内峰值增量：{stats['loop_peak_bytes'] / 1e6:.2f} MB，"
+          f"循环结束仍被引用：{stats['loop_residual_bytes'] / 1e6:.2f} MB")
+    print(f"（对照：float64完整网格坐标需 {stats['dense_grid_bytes'] / 1e6:.2f} MB）")
+    return result, stats
+
+
+def _idw_lean_kernel(samples, densities, x_range, y_range, power, max_neighbors,
+                     batch_size, tracer):
+    """idw_interpolation_lean 的计算部分；tracer 为 tracemalloc 模块或 None"""
+    # 坐标保持float64并平移到网格原点附近，避免大地坐标的绝对值吞掉像素级差异
+    x_range = np.asarray(x_range, dtype=np.float64)
+    y_range = np.asarray(y_range, dtype=np.float64)
+    x_origin = x_range[0] if len(x_range) else 0.0
+    y_origin = y_range[0] if len(y_range) else 0.0
+    x_range = x_range - x_origin
+    y_range = y_range - y_origin
+    samples = np.asarray(samples, dtype=np.float64) - (x_origin, y_origin)
+    values = np.ascontiguousarray(densities, dtype=np.float32)
+    nx, ny = len(x_range), len(y_range)
+    total_points = nx * ny
+
+    tree = KDTree(samples)
+    k_neighbors = min(max_neighbors, len(samples))
+    batch_size = max(1, min(batch_size, total_points))  # 空网格时循环不执行
+
+    # float32下 1/d**power 容易溢出：按近邻数和最大密度放大距离下限，
+    # 保证权重之和以及加权密度之和都是有限值（power<=0 时权重不会随距离变大）
+    min_distance = 1e-8
+    if power > 0:
+        float32_max = float(np.finfo(np.float32).max)
+        value_scale = max(1.0, float(np.abs(values).max()))
+        min_distance = max(min_distance,
+                           (4.0 * k_neighbors * value_scale / float32_max) ** (1.0 / power))
+
+    print(f"正在使用IDW插值(精简内核)，参数：power={power}, max_neighbors={k_neighbors}")
+
+    # 预分配缓冲区，循环内全部复用
+    interpolated = np.empty(total_points, dtype=np.float32)
+    offsets = np.arange(batch_size, dtype=np.intp)
+    flat_buf = np.empty(batch_size, dtype=np.intp)
+    row_buf = np.empty(batch_size, dtype=np.intp)
+    col_buf = np.empty(batch_size, dtype=np.intp)
+    axis_buf = np.empty(batch_size, dtype=np.float64)
+    points_buf = np.empty((batch_size, 2), dtype=np.float64)  # KDTree要求的C连续float64
+    dist_buf = np.empty((batch_size, k_neighbors), dtype=np.float32)
+    weight_buf = np.empty((batch_size, k_neighbors), dtype=np.float32)
+    value_buf = np.empty((batch_size, k_neighbors), dtype=np.float32)
+    numerator_buf = np.empty(batch_size, dtype=np.float32)
+    denominator_buf = np.empty(batch_size, dtype=np.float32)
+    scratch = (interpolated, offsets, flat_buf, row_buf, col_buf, axis_buf, points_buf, dist_buf,
+               weight_buf, value_buf, numerator_buf, denominator_buf)
+
+    if tracer is not None:
+        loop_baseline = tracer.get_traced_memory()[0]
+        tracer.reset_peak()
+
+    for i in range(0, total_points, batch_size):
+        n = min(batch_size, total_points - i)
+        flat = flat_buf[:n]
+        rows = row_buf[:n]
+        cols = col_buf[:n]
+        coord = axis_buf[:n]
+        points = points_buf[:n]
+        dist = dist_buf[:n]
+        weights = weight_buf[:n]
+        weighted = value_buf[:n]
+
+        # 按需生成本批次网格点坐标（与meshgrid展开顺序一致：行优先）
+        # 索引必然在范围内，用mode='clip'：默认的'raise'会先把结果写入临时副本
+        np.add(offsets[:n], i, out=flat)
+        np.divmod(flat, nx, out=(rows, cols))
+        np.take(x_range, cols, out=coord, mode='clip')
+        np.copyto(points[:, 0], coord)
+        np.take(y_range, rows, out=coord, mode='clip')
+        np.copyto(points[:, 1], coord)
+
+        # 查询近邻点（KDTree的返回值无法复用缓冲区，每批次都会分配）
+        distances, indices = tree.query(points, k=k_neighbors)
+        if k_neighbors == 1:
+            distances = distances[:, np.newaxis]
+            indices = indices[:, np.newaxis]
+        np.copyto(dist, distances, casting='same_kind')
+
+        # 计算权重
+        np.maximum(dist, min_distance, out=dist)  # 避免除零和溢出
+        if power == 2:
+            np.multiply(dist, dist, out=weights)
+        else:
+            np.power(dist, power, out=weights)
+        np.reciprocal(weights, out=weights)
+
+        # 加权平均
+        np.take(values, indices, out=weighted, mode='clip')
+        np.multiply(weighted, weights, out=weighted)
+        np.sum(weighted, axis=1, out=numerator_buf[:n])
+        np.sum(weights, axis=1, out=denominator_buf[:n])
+        np.divide(numerator_buf[:n], denominator_buf[:n], out=interpolated[i:i + n])
+        del distances, indices  # 先释放，避免与下一批的查询结果同时驻留
+
+        if i % (batch_size * 10) == 0:
+            print(f"处理进度: {i/total_points*100:.1f}%")
+
+    result = interpolated.reshape(ny, nx)
+    if tracer is None:
+        return result
+
+    # loop_peak_bytes 基本等于单批 tree.query 的返回值；loop_residual_bytes 应接近0
+    loop_current, loop_peak = tracer.get_traced_memory()
+    stats = {
+        'scratch_buffers': len(scratch),
+        'scratch_bytes': sum(buf.nbytes for buf in scratch),
+        'loop_peak_bytes': loop_peak - loop_baseline,
+        'loop_residual_bytes': loop_current - loop_baseline,
+        'dense_grid_bytes': total_points * 2 * np.dtype(np.float64).itemsize,
+    }
+    return result, stats
+
+
 def generate_heatmap():
     """主函数：生成热力图"""
     # 1. 配置文件路径（无需修改，样本已重命名）
@@ -0,0 +1,84 @@
+"""精简版IDW内核与float64原版的一致性回归检查"""
+import importlib
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+pytest.importorskip("matplotlib")
+pytest.importorskip("osgeo")
+pytest.importorskip("PIL")
+
+
+@pytest.fixture(scope="module")
+def idw(tmp_path_factory):
+    # 模块导入时会在当前目录写入font_test.png，切到临时目录避免污染仓库
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(tmp_path_factory.mktemp("idw"))
+        return importlib.import_module("IDW_Task.idw_interpolation")
+
+
+@pytest.fixture
+def sample_data():
+    # 样本落在整数像素上，网格同为整数坐标，保证有网格点与样本点重合
+    rng = np.random.default_rng(0)
+    xs, ys = np.meshgrid(np.arange(0, 40, 3), np.arange(0, 30, 4))
+    samples = np.vstack((xs.ravel(), ys.ravel())).T.astype(np.float32)
+    densities = rng.uniform(0, 100, len(samples)).astype(np.float32)
+    x_range = np.arange(-5, 45, 1)
+    y_range = np.arange(-5, 35, 1)
+    return samples, densities, x_range, y_range
+
+
+@pytest.mark.parametrize("power", [0, 1, 2, 3, 5, 8])
+@pytest.mark.parametrize("max_neighbors", [1, 10])
+def test_lean_matches_float64(idw, sample_data, power, max_neighbors):
+    samples, densities, x_range, y_range = sample_data
+    grid_x, grid_y = np.meshgrid(x_range, y_range)
+    expected = idw.idw_interpolation(samples, densities, grid_x, grid_y,
+                                     power=power, max_neighbors=max_neighbors)
+    with np.errstate(over="raise"):
+        result = idw.idw_interpolation_lean(samples, densities, x_range, y_range, power=power,
+                                            max_neighbors=max_neighbors, batch_size=97)
+
+    assert result.dtype == np.float32
+    assert result.shape == expected.shape
+    assert np.all(np.isfinite(result))
+    np.testing.assert_allclose(result, expected, rtol=1e-4, atol=1e-3)
+
+
+def test_lean_large_coordinate_offset(idw, sample_data):
+    # 类UTM坐标、0.1米分辨率：float32在4.4e6附近的间距为0.5米
+    samples, densities, x_range, y_range = sample_data
+    origin = np.array([500000.0, 4400000.0])
+    samples = samples.astype(np.float64) * 0.1 + origin
+    x_range = x_range * 0.1 + origin[0]
+    y_range = y_range * 0.1 + origin[1]
+    grid_x, grid_y = np.meshgrid(x_range, y_range)
+    expected = idw.idw_interpolation(samples, densities, grid_x, grid_y)
+    result = idw.idw_interpolation_lean(samples, densities, x_range, y_range)
+    np.testing.assert_allclose(result, expected, rtol=1e-4, atol=1e-3)
+
+
+def test_lean_empty_grid(idw, sample_data):
+    samples, densities, x_range, _ = sample_data
+    result = idw.idw_interpolation_lean(samples, densities, x_range, np.array([]))
+    assert result.shape == (0, len(x_range))
+
+
+def test_lean_report_memory_keeps_outer_tracing(idw, sample_data):
+    import tracemalloc
+
+    samples, densities, x_range, y_range = sample_data
+    tracemalloc.start()
+    try:
+        _, stats = idw.idw_interpolation_lean(samples, densities, x_range, y_range,
+                                              report_memory=True)
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+    assert stats['scratch_bytes'] > 0
+    assert 'loop_residual_bytes' in stats
+
+    idw.idw_interpolation_lean(samples, densities, x_range, y_range, report_memory=True)
+    assert not tracemalloc.is_tracing()